@@ -0,0 +1,79 @@
+import sys
+import time
+import tracemalloc
+
+from generate import generate
+from logic import *
+
+# Largest number of symbols to enumerate with model_check
+MAX_ENUMERATION_SYMBOLS = 20
+
+# Statements per inhabitant in generated puzzles
+STATEMENTS_PER_INHABITANT = 2
+
+
+def main():
+
+    # Check command-line arguments
+    if len(sys.argv) not in [1, 2, 3]:
+        sys.exit("Usage: python benchmark.py [max_inhabitants] [processes]")
+    max_inhabitants = int(sys.argv[1]) if len(sys.argv) >= 2 else 10
+    processes = int(sys.argv[2]) if len(sys.argv) == 3 else 4
+
+    backends = [
+        ("model_check", model_check),
+        (f"model_check x{processes}",
+         lambda knowledge, query: model_check(knowledge, query, processes)),
+        ("entails", entails)
+    ]
+
+    print(f"{'N':>4} {'backend':<18} {'time (s)':>10} "
+          f"{'peak (KiB)':>11} {'models/sec':>12}")
+    for n in range(2, max_inhabitants + 1):
+        puzzle = generate(n, STATEMENTS_PER_INHABITANT * n, seed=n)
+        symbols = 2 * n
+        for name, backend in backends:
+            if backend is not entails and symbols > MAX_ENUMERATION_SYMBOLS:
+                continue
+            elapsed, peak = measure(backend, puzzle)
+
+            # Every query is entailed, so each enumerates all models
+            if backend is entails:
+                rate = "-"
+            else:
+                models = len(puzzle.names) * 2 ** symbols
+                rate = f"{models / elapsed:.0f}"
+            print(f"{n:>4} {name:<18} {elapsed:>10.4f} "
+                  f"{peak / 1024:>11.1f} {rate:>12}")
+
+
+def measure(backend, puzzle):
+    """
+    Solves a puzzle with an inference backend, checking every symbol
+    of the known solution. Returns elapsed seconds and peak memory.
+
+    Memory is traced in a separate run, since tracing slows down
+    allocation-heavy backends.
+    """
+    start = time.perf_counter()
+    solve(backend, puzzle)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    solve(backend, puzzle)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def solve(backend, puzzle):
+    """
+    Checks that a backend infers every symbol of a puzzle's solution.
+    """
+    for symbol in puzzle.solution():
+        if not backend(puzzle.knowledge, symbol):
+            raise RuntimeError(f"backend failed to infer {symbol}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import random
+import string
+
+from logic import *
+
+
+class Puzzle():
+    """
+    Randomly generated knights and knaves puzzle
+    with exactly one consistent solution.
+    """
+
+    def __init__(self, names, claims, knights):
+        self.names = names
+        self.claims = claims
+        self.knights = knights
+
+        # Two symbols for each inhabitant, as in puzzle.py
+        self.symbols = {
+            name: (Symbol(f"{name} is a Knight"), Symbol(f"{name} is a Knave"))
+            for name in names
+        }
+
+        # Every inhabitant is exactly one of knight or knave
+        self.knowledge = And()
+        for name in names:
+            knight, knave = self.symbols[name]
+            self.knowledge.add(Or(knave, knight))
+            self.knowledge.add(Not(And(knight, knave)))
+
+        # Knights tell the truth, knaves lie
+        for speaker, claim in claims:
+            knight, knave = self.symbols[speaker]
+            sentence = self.sentence(claim)
+            self.knowledge.add(Implication(knight, sentence))
+            self.knowledge.add(Implication(knave, Not(sentence)))
+
+    def sentence(self, claim):
+        """
+        Returns the logical sentence for a claim.
+        """
+        kind, people = claim[0], claim[1:]
+        knights = [self.symbols[name][0] for name in people]
+        knaves = [self.symbols[name][1] for name in people]
+        if kind == "knight":
+            return knights[0]
+        if kind == "knave":
+            return knaves[0]
+        if kind == "same":
+            return Or(And(*knights), And(*knaves))
+        if kind == "different":
+            return Or(And(knights[0], knaves[1]), And(knaves[0], knights[1]))
+        if kind == "some knave":
+            return Or(*knaves)
+        raise ValueError(f"unknown claim {kind}")
+
+    def statements(self):
+        """
+        Returns a description of what each inhabitant says.
+        """
+        templates = {
+            "knight": "{0} is a knight.",
+            "knave": "{0} is a knave.",
+            "same": "{0} and {1} are the same kind.",
+            "different": "{0} and {1} are of different kinds.",
+            "some knave": "{0} or {1} is a knave."
+        }
+        return [
+            f'{speaker} says "{templates[claim[0]].format(*claim[1:])}"'
+            for speaker, claim in self.claims
+        ]
+
+    def solution(self):
+        """
+        Returns the symbols that are true in the unique solution.
+        """
+        return [
+            self.symbols[name][0 if self.knights[name] else 1]
+            for name in self.names
+        ]
+
+
+def holds(claim, knights):
+    """
+    Checks if a claim is true, given which inhabitants are knights.
+    """
+    kind, people = claim[0], claim[1:]
+    if kind == "knight":
+        return knights[people[0]]
+    if kind == "knave":
+        return not knights[people[0]]
+    if kind == "same":
+        return knights[people[0]] == knights[people[1]]
+    if kind == "different":
+        return knights[people[0]] != knights[people[1]]
+    if kind == "some knave":
+        return not (knights[people[0]] and knights[people[1]])
+    raise ValueError(f"unknown claim {kind}")
+
+
+def count_solutions(names, claims, limit=2):
+    """
+    Counts assignments of knights and knaves consistent with every claim,
+    stopping once `limit` solutions are found.
+
+    Inhabitants are assigned one at a time, and each claim is checked as
+    soon as everyone it mentions has been assigned.
+    """
+    position = {name: n for n, name in enumerate(names)}
+    ready = [[] for _ in names]
+    for speaker, claim in claims:
+        last = max(position[name] for name in (speaker,) + claim[1:])
+        ready[last].append((speaker, claim))
+
+    knights = dict()
+    count = 0
+    stack = [(0, True), (0, False)]
+    while stack:
+        n, value = stack.pop()
+        knights[names[n]] = value
+        if any(holds(claim, knights) != knights[speaker]
+               for speaker, claim in ready[n]):
+            continue
+        if n + 1 == len(names):
+            count += 1
+            if count >= limit:
+                break
+            continue
+        stack.append((n + 1, True))
+        stack.append((n + 1, False))
+    return count
+
+
+def inhabitant_names(n):
+    """
+    Returns names A, B, ..., Z, A1, B1, ... for `n` inhabitants.
+    """
+    letters = string.ascii_uppercase
+    return [
+        letters[i % 26] + (str(i // 26) if i >= 26 else "")
+        for i in range(n)
+    ]
+
+
+def generate(inhabitants, statements, seed=None, attempts=1000):
+    """
+    Returns a random knights and knaves puzzle with `inhabitants` people
+    making `statements` statements in total, that has exactly one solution.
+    """
+    rng = random.Random(seed)
+    names = inhabitant_names(inhabitants)
+
+    for _ in range(attempts):
+        knights = {name: rng.random() < 0.5 for name in names}
+
+        # Draw random claims the speaker can truthfully (or falsely) make
+        claims = []
+        while len(claims) < statements:
+            speaker = rng.choice(names)
+            kind = rng.choice(
+                ["knight", "knave", "same", "different", "some knave"]
+            )
+            if kind in ("knight", "knave"):
+                claim = (kind, rng.choice(names))
+            elif inhabitants > 1:
+                claim = (kind,) + tuple(rng.sample(names, 2))
+            else:
+                continue
+            if holds(claim, knights) == knights[speaker]:
+                claims.append((speaker, claim))
+
+        if count_solutions(names, claims) == 1:
+            return Puzzle(names, claims, knights)
+
+    raise ValueError(
+        f"no uniquely solvable puzzle with {inhabitants} inhabitants "
+        f"and {statements} statements found"
+    )
@@ -1,4 +1,7 @@
+import heapq
 import itertools
+import math
+import multiprocessing
 
 
 class Sentence():
@@ -225,39 +228,409 @@ class Biconditional(Sentence):
         return set.union(self.left.symbols(), self.right.symbols())
 
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+def operands(sentence):
+    """Returns the list of sentences directly contained in a sentence."""
+    if isinstance(sentence, Not):
+        return [sentence.operand]
+    if isinstance(sentence, And):
+        return sentence.conjuncts
+    if isinstance(sentence, Or):
+        return sentence.disjuncts
+    if isinstance(sentence, Implication):
+        return [sentence.antecedent, sentence.consequent]
+    if isinstance(sentence, Biconditional):
+        return [sentence.left, sentence.right]
+    return []
+
+
+def postorder(sentence):
+    """
+    Returns every distinct node of a sentence, operands before the
+    sentences that contain them. Walks the tree with an explicit stack,
+    so arbitrarily deep sentences are fine.
+    """
+    order = []
+    visited = set()
+    stack = [(sentence, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if id(node) in visited:
+            continue
+        if expanded:
+            visited.add(id(node))
+            order.append(node)
+            continue
+        stack.append((node, True))
+        for operand in reversed(operands(node)):
+            if id(operand) not in visited:
+                stack.append((operand, False))
+    return order
+
+
+def sentence_symbols(sentence):
+    """Returns the set of all symbols in a sentence, without recursion."""
+    return {
+        node.name for node in postorder(sentence)
+        if isinstance(node, Symbol)
+    }
+
+
+class CompiledSentence():
+    """
+    A sentence compiled into a flat Python function over an
+    integer-indexed model.
+
+    Every node of the sentence becomes one assignment in straight-line
+    generated code, so evaluating it needs no method dispatch, no
+    recursion and no dictionary lookups. The compiled sentence is called
+    with a sequence of booleans, where `values[i]` is the value of
+    `symbols[i]`.
+    """
+
+    def __init__(self, sentence, symbols=None):
+        Sentence.validate(sentence)
+        nodes = postorder(sentence)
+        if symbols is None:
+            symbols = sorted({
+                node.name for node in nodes if isinstance(node, Symbol)
+            })
+        self.symbols = list(symbols)
+        self.index = {name: i for i, name in enumerate(self.symbols)}
+
+        # Give each distinct node a local variable, operands first
+        names = dict()
+        lines = ["def evaluate(m):"]
+        for node in nodes:
+            name = f"t{len(names)}"
+            args = [names[id(operand)] for operand in operands(node)]
+            if isinstance(node, Symbol):
+                if node.name not in self.index:
+                    raise Exception(f"variable {node.name} not in model")
+                expression = f"m[{self.index[node.name]}]"
+            elif isinstance(node, Not):
+                expression = f"not {args[0]}"
+            elif isinstance(node, And):
+                expression = " and ".join(args) or "True"
+            elif isinstance(node, Or):
+                expression = " or ".join(args) or "False"
+            elif isinstance(node, Implication):
+                expression = f"not {args[0]} or {args[1]}"
+            elif isinstance(node, Biconditional):
+                expression = f"{args[0]} == {args[1]}"
+            else:
+                raise TypeError(f"cannot compile {type(node).__name__}")
+            lines.append(f"    {name} = {expression}")
+            names[id(node)] = name
+        lines.append(f"    return {names[id(sentence)]}")
+        self.source = "\n".join(lines)
+        self._compile()
+
+    def _compile(self):
+        namespace = dict()
+        exec(compile(self.source, "<sentence>", "exec"), namespace)
+        self.function = namespace["evaluate"]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["function"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._compile()
+
+    def __call__(self, values):
+        return self.function(values)
 
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
-
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
-        else:
-
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
+    def evaluate(self, model):
+        """Evaluates the sentence in a model mapping symbol names to values."""
+        try:
+            values = [bool(model[name]) for name in self.symbols]
+        except KeyError as e:
+            raise Exception(f"variable {e.args[0]} not in model")
+        return self.function(values)
 
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
 
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
+def model_check(knowledge, query, processes=1, split=None):
+    """
+    Checks if knowledge base entails query.
 
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+    With `processes` greater than 1, the first `split` symbols are fixed
+    in every combination and each resulting sub-space of models is
+    checked by a separate worker process.
+    """
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
-
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    symbols = sorted(set.union(
+        sentence_symbols(knowledge), sentence_symbols(query)
+    ))
+
+    # Compile both sentences over the same symbol ordering
+    knowledge = CompiledSentence(knowledge, symbols)
+    query = CompiledSentence(query, symbols)
+
+    if processes > 1:
+        if split is None:
+            split = math.ceil(math.log2(processes)) + 2
+        split = min(split, len(symbols))
+        if split > 0:
+            return parallel_check_all(knowledge, query, processes, split)
+
+    # Check that query is true in every model where knowledge is true
+    for values in itertools.product((True, False), repeat=len(symbols)):
+        if knowledge(values) and not query(values):
+            return False
+    return True
+
+
+def parallel_check_all(knowledge, query, processes, split):
+    """
+    Checks entailment by handing every assignment of the first `split`
+    symbols to a process pool, stopping all workers as soon as one of
+    them finds a counter-model.
+    """
+    prefixes = itertools.product((True, False), repeat=split)
+    pool = multiprocessing.Pool(
+        processes, initializer=_init_worker, initargs=(knowledge, query)
+    )
+    try:
+        for entailed in pool.imap_unordered(_check_prefix, prefixes):
+            if not entailed:
+                return False
+        return True
+    finally:
+        pool.terminate()
+
+
+_worker_sentences = None
+
+
+def _init_worker(knowledge, query):
+    global _worker_sentences
+    _worker_sentences = (knowledge, query)
+
+
+def _check_prefix(prefix):
+    """Checks every model that starts with the given symbol values."""
+    knowledge, query = _worker_sentences
+    remaining = len(knowledge.symbols) - len(prefix)
+    for rest in itertools.product((True, False), repeat=remaining):
+        values = prefix + rest
+        if knowledge(values) and not query(values):
+            return False
+    return True
+
+
+def to_cnf(sentence, index):
+    """
+    Converts a sentence into conjunctive normal form.
+
+    Returns a set of clauses, each a frozenset of integer literals: the
+    symbol with index `i` in `index` is the literal `i + 1`, and its
+    negation is `-(i + 1)`. Tautological and subsumed clauses are dropped.
+
+    Each node is converted only with the polarities it is reached with
+    (positive, or negated by an enclosing Not or Implication), so the
+    negation of a large conjunction is never distributed unless needed.
+    """
+    cnfs = dict()
+    stack = [(sentence, True, False)]
+    while stack:
+        node, positive, expanded = stack.pop()
+        key = (id(node), positive)
+        if key in cnfs:
+            continue
+        needed = _polarities(node, positive)
+        if not expanded:
+            stack.append((node, positive, True))
+            stack.extend(
+                (operand, polarity, False) for operand, polarity in needed
+                if (id(operand), polarity) not in cnfs
+            )
+            continue
+        args = [cnfs[(id(operand), polarity)] for operand, polarity in needed]
+        if isinstance(node, Symbol):
+            literal = index[node.name] + 1
+            cnfs[key] = [frozenset([literal if positive else -literal])]
+        elif isinstance(node, Not):
+            cnfs[key] = args[0]
+        elif isinstance(node, And):
+            cnfs[key] = _conjoin(args) if positive else _distribute(args)
+        elif isinstance(node, Or):
+            cnfs[key] = _distribute(args) if positive else _conjoin(args)
+        elif isinstance(node, Implication):
+            cnfs[key] = _distribute(args) if positive else _conjoin(args)
+        else:
+            left, right, left_negated, right_negated = args
+            if positive:
+                cnfs[key] = _conjoin([
+                    _distribute([left_negated, right]),
+                    _distribute([left, right_negated])
+                ])
+            else:
+                cnfs[key] = _conjoin([
+                    _distribute([left, right]),
+                    _distribute([left_negated, right_negated])
+                ])
+    return set(cnfs[(id(sentence), True)])
+
+
+def _polarities(node, positive):
+    """
+    Returns the operands, with their polarities, whose CNFs are
+    needed to convert `node` with the given polarity.
+    """
+    if isinstance(node, Symbol):
+        return []
+    if isinstance(node, Not):
+        return [(node.operand, not positive)]
+    if isinstance(node, (And, Or)):
+        return [(operand, positive) for operand in operands(node)]
+    if isinstance(node, Implication):
+        return [(node.antecedent, not positive), (node.consequent, positive)]
+    if isinstance(node, Biconditional):
+        return [(node.left, True), (node.right, True),
+                (node.left, False), (node.right, False)]
+    raise TypeError(f"cannot convert {type(node).__name__}")
+
+
+def _conjoin(cnfs):
+    """Returns the conjunction of several CNF clause lists."""
+    return _simplify([clause for cnf in cnfs for clause in cnf])
+
+
+def _distribute(cnfs):
+    """Returns the disjunction of several CNF clause lists."""
+    result = [frozenset()]
+    for cnf in cnfs:
+        result = _simplify([
+            clause | other for clause in result for other in cnf
+        ])
+    return result
+
+
+def _simplify(clauses):
+    """Removes tautologies and subsumed clauses from a list of clauses."""
+    kept = []
+    for clause in sorted(set(clauses), key=len):
+        if is_tautology(clause):
+            continue
+        if any(other <= clause for other in kept):
+            continue
+        kept.append(clause)
+    return kept
+
+
+def is_tautology(clause):
+    """Checks if a clause contains both a literal and its negation."""
+    return any(-literal in clause for literal in clause)
+
+
+def is_horn(clause):
+    """Checks if a clause has at most one positive literal."""
+    return sum(1 for literal in clause if literal > 0) <= 1
+
+
+def forward_chain(clauses):
+    """
+    Checks if a set of Horn clauses is satisfiable.
+
+    Runs in time linear in the total size of the clauses: each clause
+    keeps a count of body atoms not yet known to be true, and each atom
+    becomes true at most once.
+    """
+    remaining = []
+    heads = []
+    watching = dict()
+    agenda = []
+    for n, clause in enumerate(clauses):
+        body = [-literal for literal in clause if literal < 0]
+        head = next((literal for literal in clause if literal > 0), None)
+        remaining.append(len(body))
+        heads.append(head)
+        for atom in body:
+            watching.setdefault(atom, []).append(n)
+        if not body:
+            if head is None:
+                return False
+            agenda.append(head)
+
+    inferred = set()
+    while agenda:
+        atom = agenda.pop()
+        if atom in inferred:
+            continue
+        inferred.add(atom)
+        for n in watching.get(atom, []):
+            remaining[n] -= 1
+            if remaining[n] == 0:
+                if heads[n] is None:
+                    return False
+                agenda.append(heads[n])
+    return True
+
+
+def resolve(clauses):
+    """
+    Checks if a set of clauses is satisfiable using resolution.
+
+    Clauses are processed shortest first. Each literal is indexed to the
+    processed clauses containing it, so a new clause is only resolved
+    against clauses holding the complementary literal. Tautologies and
+    clauses subsumed by an already processed clause are discarded.
+    """
+    processed = set()
+    containing = dict()
+    queue = [(len(clause), n, clause) for n, clause in enumerate(clauses)]
+    heapq.heapify(queue)
+    counter = len(queue)
+
+    while queue:
+        _, _, clause = heapq.heappop(queue)
+
+        # Empty clause means the set is unsatisfiable
+        if not clause:
+            return False
+
+        # Forward subsumption: any subsumer shares a literal with clause
+        if clause in processed or is_tautology(clause) or any(
+            other <= clause
+            for literal in clause
+            for other in containing.get(literal, ())
+        ):
+            continue
+
+        # Resolve against clauses containing complementary literals
+        for literal in clause:
+            for other in containing.get(-literal, ()):
+                resolvent = (clause - {literal}) | (other - {-literal})
+                if resolvent in processed or is_tautology(resolvent):
+                    continue
+                heapq.heappush(queue, (len(resolvent), counter, resolvent))
+                counter += 1
+
+        processed.add(clause)
+        for literal in clause:
+            containing.setdefault(literal, set()).add(clause)
+
+    return True
+
+
+def entails(knowledge, query):
+    """
+    Checks if knowledge base entails query using resolution.
+
+    The knowledge base and the negated query are converted into CNF;
+    the query is entailed if those clauses are unsatisfiable. Sets of
+    Horn clauses are decided by forward chaining instead.
+    """
+    symbols = sorted(set.union(
+        sentence_symbols(knowledge), sentence_symbols(query)
+    ))
+    index = {name: i for i, name in enumerate(symbols)}
+    clauses = _conjoin([
+        to_cnf(knowledge, index), to_cnf(Not(query), index)
+    ])
+    if all(is_horn(clause) for clause in clauses):
+        return not forward_chain(clauses)
+    return not resolve(clauses)
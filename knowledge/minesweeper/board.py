@@ -0,0 +1,69 @@
+import random
+
+import numpy as np
+
+from minesweeper import Minesweeper
+
+
+class NumpyMinesweeper(Minesweeper):
+    """
+    Minesweeper game representation backed by NumPy arrays,
+    for boards too large to handle one cell at a time.
+
+    Mines are placed with a single vectorized draw, and the number of
+    nearby mines for every cell is precomputed when the board is
+    created, so `nearby_mines` is a single array lookup.
+    """
+
+    def __init__(self, height=8, width=8, mines=8, seed=None):
+
+        # Set initial width, height, and number of mines
+        self.height = height
+        self.width = width
+        self.mine_count = mines
+
+        # Draw from the random module if no seed is given, so seeding
+        # it makes games reproducible just like Minesweeper
+        if seed is None:
+            seed = random.getrandbits(64)
+        rng = np.random.default_rng(seed)
+
+        # Add mines randomly, choosing distinct cells in one draw
+        positions = rng.choice(height * width, size=mines, replace=False)
+        self.grid = np.zeros((height, width), dtype=bool)
+        self.grid.flat[positions] = True
+
+        # Count nearby mines for every cell with a 3x3 box filter,
+        # summing rows then columns of the zero-padded grid
+        padded = np.pad(self.grid.astype(np.uint8), 1)
+        rows = padded[:-2] + padded[1:-1] + padded[2:]
+        boxes = rows[:, :-2] + rows[:, 1:-1] + rows[:, 2:]
+        self.counts = boxes - self.grid
+
+        # At first, player has found no mines
+        self.mines_found = set()
+        self._mines = None
+
+    @property
+    def mines(self):
+        """
+        Returns the set of mine cells, built on first use.
+        """
+        if self._mines is None:
+            self._mines = set(zip(*(
+                axis.tolist() for axis in np.nonzero(self.grid)
+            )))
+        return self._mines
+
+    def is_mine(self, cell):
+        i, j = cell
+        return bool(self.grid[i, j])
+
+    def nearby_mines(self, cell):
+        """
+        Returns the number of mines that are
+        within one row and column of a given cell,
+        not including the cell itself.
+        """
+        i, j = cell
+        return int(self.counts[i, j])
@@ -1,6 +1,9 @@
 import itertools
+import math
 import random
 
+from collections import deque
+
 
 class Minesweeper():
     """
@@ -14,25 +17,31 @@ class Minesweeper():
         self.width = width
         self.mines = set()
 
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
+        # Initialize an empty field with no mines, one byte per cell
+        self.field = bytearray(height * width)
 
         # Add mines randomly
         while len(self.mines) != mines:
             i = random.randrange(height)
             j = random.randrange(width)
-            if not self.board[i][j]:
+            if not self.is_mine((i, j)):
                 self.mines.add((i, j))
-                self.board[i][j] = True
+                self.field[i * width + j] = 1
 
         # At first, player has found no mines
         self.mines_found = set()
 
+    @property
+    def board(self):
+        """
+        Returns the board as a list of rows of booleans,
+        where True marks a mine.
+        """
+        return [
+            [self.is_mine((i, j)) for j in range(self.width)]
+            for i in range(self.height)
+        ]
+
     def print(self):
         """
         Prints a text-based representation
@@ -41,7 +50,7 @@ class Minesweeper():
         for i in range(self.height):
             print("--" * self.width + "-")
             for j in range(self.width):
-                if self.board[i][j]:
+                if self.is_mine((i, j)):
                     print("|X", end="")
                 else:
                     print("| ", end="")
@@ -50,7 +59,7 @@ class Minesweeper():
 
     def is_mine(self, cell):
         i, j = cell
-        return self.board[i][j]
+        return self.field[i * self.width + j] == 1
 
     def nearby_mines(self, cell):
         """
@@ -58,24 +67,18 @@ class Minesweeper():
         within one row and column of a given cell,
         not including the cell itself.
         """
+        i, j = cell
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
+        # Sum the row slices within one row and column, clipped to the board
+        low = max(j - 1, 0)
+        high = min(j + 2, self.width)
+        count = sum(
+            sum(self.field[row * self.width + low:row * self.width + high])
+            for row in range(max(i - 1, 0), min(i + 2, self.height))
+        )
 
-        return count
+        # Ignore the cell itself
+        return count - self.field[i * self.width + j]
 
     def won(self):
         """
@@ -83,32 +86,140 @@ class Minesweeper():
         """
         return self.mines_found == self.mines
 
+    def flood_fill(self, cell):
+        """
+        Returns the cells revealed by clicking a safe cell, as a list of
+        (cell, nearby mines) pairs. Cells with no nearby mines reveal
+        their neighbors too, so a zero opens a whole region.
+        """
+        revealed = {cell: self.nearby_mines(cell)}
+        frontier = [cell]
+        while frontier:
+            i, j = frontier.pop()
+            if revealed[(i, j)] != 0:
+                continue
+            for row in range(max(i - 1, 0), min(i + 2, self.height)):
+                for column in range(max(j - 1, 0), min(j + 2, self.width)):
+                    if (row, column) not in revealed:
+                        revealed[(row, column)] = self.nearby_mines((row, column))
+                        frontier.append((row, column))
+        return list(revealed.items())
+
+
+class CellIndex():
+    """
+    Mapping between board cells and bit positions, so that sets
+    of cells can be stored as the bits of a Python int.
+
+    Each AI keeps its own index, so positions never outgrow its board.
+    """
+
+    def __init__(self):
+        self.bits = dict()
+        self.cells_by_bit = []
+
+    def bit(self, cell):
+        """
+        Returns the bit position of a cell, assigning the next free
+        position to cells not seen before.
+        """
+        bit = self.bits.get(cell)
+        if bit is None:
+            bit = len(self.cells_by_bit)
+            self.bits[cell] = bit
+            self.cells_by_bit.append(cell)
+        return bit
+
+    def mask(self, cells):
+        """
+        Returns the int with the bits of all given cells set.
+        """
+        mask = 0
+        for cell in cells:
+            mask |= 1 << self.bit(cell)
+        return mask
+
+    def cells(self, mask):
+        """
+        Returns the set of cells whose bits are set in `mask`.
+        """
+        return frozenset(self.cells_by_bit[bit] for bit in bits(mask))
+
+
+def bits(mask):
+    """
+    Yields the positions of the set bits of `mask`, lowest first.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
 
 class Sentence():
     """
     Logical statement about a Minesweeper game
     A sentence consists of a set of board cells,
     and a count of the number of those cells which are mines.
+
+    Cells are stored as a bitmask over the positions in a CellIndex,
+    so that subset and difference checks are single int operations.
+    Sentences compared or combined by mask must share an index; a
+    sentence made without one gets an index of its own.
     """
 
-    def __init__(self, cells, count):
-        self.cells = set(cells)
+    def __init__(self, cells, count, index=None):
+        self.index = CellIndex() if index is None else index
+        self.mask = self.index.mask(cells)
         self.count = count
 
+    @classmethod
+    def from_mask(cls, mask, count, index):
+        """
+        Returns a sentence over the cells whose bits are set in `mask`.
+        """
+        sentence = cls((), count, index)
+        sentence.mask = mask
+        return sentence
+
+    @property
+    def cells(self):
+        """
+        Returns the sentence's cells, decoded from its mask into a new
+        frozenset. Assign to `cells`, or use `mark_mine` and `mark_safe`,
+        to change them.
+        """
+        return self.index.cells(self.mask)
+
+    @cells.setter
+    def cells(self, cells):
+        self.mask = self.index.mask(cells)
+
     def __eq__(self, other):
-        return self.cells == other.cells and self.count == other.count
+        if self.index is not other.index:
+            return self.cells == other.cells and self.count == other.count
+        return self.mask == other.mask and self.count == other.count
 
     def __str__(self):
-        return f"{self.cells} = {self.count}"
+        return f"{set(self.cells)} = {self.count}"
+
+    def __len__(self):
+        return self.mask.bit_count()
+
+    def key(self):
+        """
+        Returns a hashable key identifying the sentence's current contents.
+        """
+        return (self.mask, self.count)
 
     def known_mines(self):
         """
         Returns the set of all cells in self.cells known to be mines.
         """
-        if len(self.cells) == self.count and self.count!=0:
+        if len(self) == self.count and self.count != 0:
             return self.cells
         else:
-            return set()
+            return frozenset()
 
     def known_safes(self):
         """
@@ -116,25 +227,320 @@ class Sentence():
         """
         if self.count == 0:
             return self.cells
-        return set()
+        return frozenset()
 
     def mark_mine(self, cell):
         """
         Updates internal knowledge representation given the fact that
         a cell is known to be a mine.
         """
-        if cell in self.cells:
-            self.cells.remove(cell)
-            self.count -=1
-        
+        bit = 1 << self.index.bit(cell)
+        if self.mask & bit:
+            self.mask ^= bit
+            self.count -= 1
 
     def mark_safe(self, cell):
         """
         Updates internal knowledge representation given the fact that
         a cell is known to be safe.
         """
-        if cell in self.cells:
-           self.cells.remove(cell)
+        self.mask &= ~(1 << self.index.bit(cell))
+
+
+class KnowledgeBase():
+    """
+    Collection of sentences known to be true, indexed by the cells
+    they contain and deduplicated by their cells and count.
+
+    Every sentence that is added or changed is queued, so that
+    inference only needs to revisit sentences that changed.
+    """
+
+    def __init__(self, index):
+
+        # Bit positions of cells, shared by every sentence added
+        self.index = index
+
+        # Sentences by key, and the keys of sentences containing each cell bit
+        self.sentences = dict()
+        self.containing = dict()
+
+        # Keys of sentences added or changed since they were last examined
+        self.queue = deque()
+        self.queued = set()
+
+    def __iter__(self):
+        return iter(list(self.sentences.values()))
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def __contains__(self, sentence):
+        return sentence.key() in self.sentences
+
+    def add(self, sentence):
+        """
+        Adds a sentence, unless it is empty or already known, and queues it.
+        Returns whether the sentence was added.
+        """
+        if not sentence.mask:
+            if sentence.count != 0:
+                raise ValueError("inconsistent knowledge")
+            return False
+
+        key = sentence.key()
+        if key in self.sentences:
+            return False
+
+        self.sentences[key] = sentence
+        for bit in bits(sentence.mask):
+            self.containing.setdefault(bit, set()).add(key)
+        if key not in self.queued:
+            self.queue.append(key)
+            self.queued.add(key)
+        return True
+
+    def remove(self, key):
+        """
+        Removes and returns the sentence with the given key.
+        """
+        sentence = self.sentences.pop(key)
+        for bit in bits(sentence.mask):
+            keys = self.containing[bit]
+            keys.discard(key)
+            if not keys:
+                del self.containing[bit]
+        return sentence
+
+    def next_changed(self):
+        """
+        Returns the next queued sentence still in the knowledge base,
+        or None if no sentences are waiting to be examined.
+        """
+        while self.queue:
+            key = self.queue.popleft()
+            self.queued.discard(key)
+            if key in self.sentences:
+                return self.sentences[key]
+        return None
+
+    def mark_mine(self, cell):
+        """
+        Marks a cell as a mine in every sentence containing it.
+        """
+        for key in list(self.containing.get(self.index.bit(cell), ())):
+            sentence = self.remove(key)
+            sentence.mark_mine(cell)
+            self.add(sentence)
+
+    def mark_safe(self, cell):
+        """
+        Marks a cell as safe in every sentence containing it.
+        """
+        for key in list(self.containing.get(self.index.bit(cell), ())):
+            sentence = self.remove(key)
+            sentence.mark_safe(cell)
+            self.add(sentence)
+
+    def overlapping(self, sentence):
+        """
+        Returns the other sentences sharing at least one cell with `sentence`.
+        """
+        keys = set()
+        for bit in bits(sentence.mask):
+            keys.update(self.containing.get(bit, ()))
+        keys.discard(sentence.key())
+        return [self.sentences[key] for key in keys]
+
+    def components(self):
+        """
+        Returns the sentences grouped into independent components,
+        where sentences sharing a cell are in the same component.
+        """
+        components = []
+        seen = set()
+        for key in self.sentences:
+            if key in seen:
+                continue
+            seen.add(key)
+            component = []
+            frontier = [key]
+            while frontier:
+                sentence = self.sentences[frontier.pop()]
+                component.append(sentence)
+                for other in self.overlapping(sentence):
+                    if other.key() not in seen:
+                        seen.add(other.key())
+                        frontier.append(other.key())
+            components.append(component)
+        return components
+
+
+def convolve(a, b):
+    """
+    Returns the product of two polynomials given as coefficient lists.
+    """
+    result = [0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(a):
+        if x:
+            for j, y in enumerate(b):
+                result[i + j] += x * y
+    return result
+
+
+def count_assignments(sentences):
+    """
+    Counts the mine assignments consistent with a connected
+    component of sentences.
+
+    Returns the component's cell bits, `ways`, where ways[k] is the
+    number of consistent assignments with k mines, and `cell_ways`,
+    where cell_ways[n][k] is how many of those assignments make the
+    n-th cell a mine.
+
+    Cells are assigned in breadth-first order, so each sentence is only
+    open for a short stretch. Partial assignments are merged by the
+    remaining count of every sentence, which is computed once in a
+    forward pass and once in a backward pass.
+    """
+
+    # Order cells so that neighbouring sentences are assigned together
+    order = []
+    placed = set()
+    for sentence in sentences:
+        for bit in bits(sentence.mask):
+            if bit not in placed:
+                placed.add(bit)
+                order.append(bit)
+    position = {bit: n for n, bit in enumerate(order)}
+
+    # For each cell, the sentences it is in and how many of their
+    # cells come after it
+    touching = [[] for _ in order]
+    for s, sentence in enumerate(sentences):
+        positions = sorted(position[bit] for bit in bits(sentence.mask))
+        for left, n in enumerate(reversed(positions)):
+            touching[n].append((s, left))
+
+    def step(state, n, mine):
+        """Returns the state after assigning cell n, or None if invalid."""
+        state = list(state)
+        for s, left in touching[n]:
+            state[s] -= mine
+            if not 0 <= state[s] <= left:
+                return None
+        return tuple(state)
+
+    # Forward pass: ways to reach each state with k mines so far
+    start = tuple(sentence.count for sentence in sentences)
+    forward = [{start: [1]}]
+    for n in range(len(order)):
+        states = dict()
+        for state, poly in forward[n].items():
+            for mine in (0, 1):
+                after = step(state, n, mine)
+                if after is None:
+                    continue
+                shifted = [0] * mine + poly
+                total = states.setdefault(after, [])
+                total.extend([0] * (len(shifted) - len(total)))
+                for k, x in enumerate(shifted):
+                    total[k] += x
+        forward.append(states)
+
+    # Backward pass: ways to finish from each state with k more mines
+    backward = [None] * len(order) + [{s: [1] for s in forward[-1]}]
+    cell_ways = [None] * len(order)
+    for n in reversed(range(len(order))):
+        states = dict()
+        mined = []
+        for state, poly in forward[n].items():
+            for mine in (0, 1):
+                after = step(state, n, mine)
+                if after is None or after not in backward[n + 1]:
+                    continue
+                shifted = [0] * mine + backward[n + 1][after]
+                total = states.setdefault(state, [])
+                total.extend([0] * (len(shifted) - len(total)))
+                for k, x in enumerate(shifted):
+                    total[k] += x
+                if mine:
+                    product = convolve(poly, shifted)
+                    mined.extend([0] * (len(product) - len(mined)))
+                    for k, x in enumerate(product):
+                        mined[k] += x
+        backward[n] = states
+        cell_ways[n] = mined
+
+    ways = backward[0].get(start, [0])
+    return order, ways, cell_ways
+
+
+def forced_cells(sentences):
+    """
+    Returns the bits of the cells that a group of sentences forces
+    to be safe, and of those it forces to be mines.
+
+    Sentences are treated as rows of a sparse 0/1 matrix and reduced
+    by Gauss-Jordan elimination over the integers. Each reduced row
+    sum(a * x) = total then bounds every cell in it: a cell is forced
+    if one of its two values would put the total out of reach of the
+    row's other cells.
+    """
+
+    # Reduced rows as ({bit: coefficient}, total), one per pivot bit
+    reduced = dict()
+    for sentence in sentences:
+        row = {bit: 1 for bit in bits(sentence.mask)}
+        total = sentence.count
+
+        # Eliminate existing pivots from the new row
+        for pivot, (other, other_total) in reduced.items():
+            if pivot in row:
+                row, total = combine(row, total, other, other_total, pivot)
+        if not row:
+            continue
+
+        # Eliminate the new pivot from the existing rows
+        pivot = min(row)
+        for other_pivot, (other, other_total) in list(reduced.items()):
+            if pivot in other:
+                reduced[other_pivot] = combine(
+                    other, other_total, row, total, pivot
+                )
+        reduced[pivot] = (row, total)
+
+    # Bound reasoning on each reduced row
+    safes = 0
+    mines = 0
+    for row, total in reduced.values():
+        highest = sum(a for a in row.values() if a > 0)
+        lowest = sum(a for a in row.values() if a < 0)
+        for bit, a in row.items():
+            if a > 0 and lowest + a > total or a < 0 and highest + a < total:
+                safes |= 1 << bit
+            elif a > 0 and highest - a < total or a < 0 and lowest - a > total:
+                mines |= 1 << bit
+    return safes, mines
+
+
+def combine(row, total, other, other_total, pivot):
+    """
+    Returns `row` with `pivot` eliminated using `other`, scaled to
+    keep integer coefficients with no common factor.
+    """
+    scale, other_scale = other[pivot], row[pivot]
+    result = {bit: a * scale for bit, a in row.items()}
+    for bit, a in other.items():
+        result[bit] = result.get(bit, 0) - a * other_scale
+    result = {bit: a for bit, a in result.items() if a}
+    total = total * scale - other_total * other_scale
+
+    divisor = math.gcd(total, *result.values())
+    if divisor > 1:
+        result = {bit: a // divisor for bit, a in result.items()}
+        total //= divisor
+    return result, total
 
 
 class MinesweeperAI():
@@ -142,11 +548,12 @@ class MinesweeperAI():
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=None):
 
-        # Set initial height and width
+        # Set initial height and width, and total mines if known
         self.height = height
         self.width = width
+        self.total_mines = mines
 
         # Keep track of which cells have been clicked on
         self.moves_made = set()
@@ -155,8 +562,17 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Give the board's cells bit positions in row-major order
+        self.index = CellIndex()
+        for i in range(height):
+            for j in range(width):
+                self.index.bit((i, j))
+
+        # Sentences about the game known to be true
+        self.knowledge = KnowledgeBase(self.index)
+
+        # Assignment counts of the components seen by the last guess
+        self.component_cache = dict()
 
     def mark_mine(self, cell):
         """
@@ -164,8 +580,7 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self.knowledge.mark_mine(cell)
 
     def mark_safe(self, cell):
         """
@@ -173,8 +588,7 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        self.knowledge.mark_safe(cell)
 
     def add_knowledge(self, cell, count):
         """
@@ -192,10 +606,35 @@ class MinesweeperAI():
                if they can be inferred from existing knowledge
         """
 
-        # Mark the cell as a move that has been made, and mark as safe:
-        self.moves_made.add(cell)
-        self.mark_safe(cell)
+        self.add_knowledge_batch([(cell, count)])
 
+    def add_knowledge_batch(self, revealed):
+        """
+        Adds knowledge for many revealed safe cells at once, given as
+        (cell, count) pairs, such as a region opened by a flood fill.
+        Every sentence is added before inference runs, so the whole
+        batch costs a single inference pass.
+        """
+        revealed = list(revealed)
+
+        # Mark the cells as moves that have been made, and mark as safe:
+        for cell, _ in revealed:
+            self.moves_made.add(cell)
+            self.mark_safe(cell)
+
+        for cell, count in revealed:
+            self.knowledge.add(self.neighbor_sentence(cell, count))
+        self.infer()
+
+        # When subset inference leaves no safe move, try linear algebra
+        while not self.safes - self.moves_made and self.infer_linear():
+            self.infer()
+
+    def neighbor_sentence(self, cell, count):
+        """
+        Returns a sentence saying that `count` of the unknown cells
+        around `cell` are mines.
+        """
         new_sentence_cells = set()
 
         # Loop over all cells within one row and column
@@ -219,60 +658,65 @@ class MinesweeperAI():
                 if 0 <= i < self.height and 0 <= j < self.width:
                     new_sentence_cells.add((i, j))
 
-        self.knowledge.append(Sentence(new_sentence_cells, count))
-
-        # Iteratively mark guaranteed mines and safes, and infer new knowledge:
-        knowledge_changed = True
-
-        while knowledge_changed:
-            knowledge_changed = False
-
-            safes = set()
-            mines = set()
-
-            # Get set of safe spaces and mines from KB
-            for sentence in self.knowledge:
-                safes = safes.union(sentence.known_safes())
-                mines = mines.union(sentence.known_mines())
-
-            # Mark any safe spaces or mines:
-            if safes:
-                knowledge_changed = True
-                for safe in safes:
-                    self.mark_safe(safe)
-            if mines:
-                knowledge_changed = True
-                for mine in mines:
-                    self.mark_mine(mine)
-
-            # Remove any empty sentences from knowledge base:
-            empty = Sentence(set(), 0)
-
-            self.knowledge[:] = [x for x in self.knowledge if x != empty]
-
-            # Try to infer new sentences from the current ones:
-            for sentence1 in self.knowledge:
-                for sentence2 in self.knowledge:
-
-                    # Ignore when sentences are identical
-                    if sentence1.cells == sentence2.cells:
-                        continue
+        return Sentence(new_sentence_cells, count, self.index)
 
-                    if sentence1.cells == set() and sentence1.count > 0:
-                        raise ValueError
+    def infer(self):
+        """
+        Draws conclusions from every sentence that changed since it
+        was last examined, until no changed sentences remain.
+        """
+        while True:
+            sentence = self.knowledge.next_changed()
+            if sentence is None:
+                break
+
+            # Mark any safe spaces or mines, which queues touched sentences:
+            safes = list(sentence.known_safes())
+            mines = list(sentence.known_mines())
+            for safe in safes:
+                self.mark_safe(safe)
+            for mine in mines:
+                self.mark_mine(mine)
+            if safes or mines:
+                continue
+
+            # Try to infer new sentences from ones sharing cells:
+            for other in self.knowledge.overlapping(sentence):
+
+                # Ignore sentences about the same cells
+                if other.mask == sentence.mask:
+                    continue
 
-                    # Create a new sentence if 1 is subset of 2, and not in KB:
-                    if sentence1.cells.issubset(sentence2.cells):
-                        new_sentence_cells = sentence2.cells - sentence1.cells
-                        new_sentence_count = sentence2.count - sentence1.count
+                # Create a new sentence if one is a subset of the other:
+                if sentence.mask & ~other.mask == 0:
+                    subset, superset = sentence, other
+                elif other.mask & ~sentence.mask == 0:
+                    subset, superset = other, sentence
+                else:
+                    continue
+                self.knowledge.add(Sentence.from_mask(
+                    superset.mask & ~subset.mask,
+                    superset.count - subset.count,
+                    self.index
+                ))
 
-                        new_sentence = Sentence(new_sentence_cells, new_sentence_count)
+    def infer_linear(self):
+        """
+        Marks every cell forced to be safe or a mine by the linear
+        system of each component of the knowledge base.
+        Returns whether any cell was marked.
+        """
+        marked = False
+        for sentences in self.knowledge.components():
+            safes, mines = forced_cells(sentences)
+            for cell in self.index.cells(safes):
+                self.mark_safe(cell)
+                marked = True
+            for cell in self.index.cells(mines):
+                self.mark_mine(cell)
+                marked = True
+        return marked
 
-                        # Add to knowledge if not already in KB:
-                        if new_sentence not in self.knowledge:
-                            knowledge_changed = True
-                        
-                            self.knowledge.append(new_sentence)
     def make_safe_move(self):
         """
         Returns a safe cell to choose on the Minesweeper board.
@@ -287,16 +731,112 @@ class MinesweeperAI():
             return random.choice(list(safe_moves))
         return None
 
+    def mine_probabilities(self):
+        """
+        Returns the exact probability that each unrevealed cell not
+        known to be a mine is a mine, given all knowledge and the total
+        number of mines, or None if the total is unknown.
+
+        Sentences are split into independent components whose consistent
+        assignments are counted separately. The counts are combined by
+        weighting each total number of frontier mines with the number of
+        ways to place the remaining mines among unconstrained cells.
+        """
+        if self.total_mines is None:
+            return None
+
+        # Count assignments of each component, reusing unchanged ones
+        cache = dict()
+        components = []
+        for sentences in self.knowledge.components():
+            key = frozenset(sentence.key() for sentence in sentences)
+            if key in self.component_cache:
+                cache[key] = self.component_cache[key]
+            else:
+                cache[key] = count_assignments(sentences)
+            components.append(cache[key])
+        self.component_cache = cache
+
+        # Cells not mentioned by any sentence
+        frontier = set()
+        for order, _, _ in components:
+            frontier.update(order)
+        outside = [
+            (i, j)
+            for i in range(self.height)
+            for j in range(self.width)
+            if (i, j) not in self.moves_made
+            and (i, j) not in self.mines
+            and (i, j) not in self.safes
+            and self.index.bit((i, j)) not in frontier
+        ]
+        remaining = self.total_mines - len(self.mines)
+
+        def weight(k, cells):
+            """Ways to place the mines left after k among `cells` cells."""
+            if 0 <= remaining - k <= cells:
+                return math.comb(cells, remaining - k)
+            return 0
+
+        # Products of all components' counts before and after each one
+        before = [[1]]
+        for _, ways, _ in components:
+            before.append(convolve(before[-1], ways))
+        after = [[1]]
+        for _, ways, _ in reversed(components):
+            after.append(convolve(after[-1], ways))
+        after.reverse()
+
+        total = sum(
+            ways * weight(k, len(outside)) for k, ways in enumerate(before[-1])
+        )
+        if total == 0:
+            return None
+
+        probabilities = {cell: 0.0 for cell in self.safes - self.moves_made}
+        for c, (order, _, cell_ways) in enumerate(components):
+
+            # Weight of k mines here, summed over the other components
+            others = convolve(before[c], after[c + 1])
+            weights = [
+                sum(x * weight(k + j, len(outside))
+                    for j, x in enumerate(others))
+                for k in range(max(len(ways) for ways in cell_ways))
+            ]
+            for bit, ways in zip(order, cell_ways):
+                mined = sum(x * weights[k] for k, x in enumerate(ways))
+                probabilities[self.index.cells_by_bit[bit]] = mined / total
+
+        if outside:
+            mined = sum(
+                ways * weight(k + 1, len(outside) - 1)
+                for k, ways in enumerate(before[-1])
+            )
+            for cell in outside:
+                probabilities[cell] = mined / total
+
+        return probabilities
+
     def make_random_move(self):
         """
         Returns a move to make on the Minesweeper board.
         Should choose randomly among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+
+        When the total number of mines is known, chooses randomly
+        among the cells least likely to be mines instead.
         """
         if len(self.mines) + len(self.moves_made) == self.height * self.width:
             return None
 
+        probabilities = self.mine_probabilities()
+        if probabilities:
+            lowest = min(probabilities.values())
+            return random.choice([
+                cell for cell, p in probabilities.items() if p == lowest
+            ])
+
         while True:
             i = random.randrange(self.height)
             j = random.randrange(self.width)
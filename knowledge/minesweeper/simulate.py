@@ -0,0 +1,105 @@
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+HEIGHT = 8
+WIDTH = 8
+MINES = 8
+
+
+def main():
+
+    # Check command-line arguments
+    if len(sys.argv) not in [2, 5, 6, 7]:
+        sys.exit("Usage: python simulate.py games "
+                 "[height width mines [processes [seed]]]")
+    games = int(sys.argv[1])
+    height, width, mines = HEIGHT, WIDTH, MINES
+    if len(sys.argv) >= 5:
+        height, width, mines = (int(arg) for arg in sys.argv[2:5])
+    processes = int(sys.argv[5]) if len(sys.argv) >= 6 else os.cpu_count()
+    seed = int(sys.argv[6]) if len(sys.argv) == 7 else 0
+
+    start = time.perf_counter()
+    results = simulate(games, height, width, mines, processes, seed)
+    elapsed = time.perf_counter() - start
+
+    # Summarize results across all games
+    wins = sum(result["won"] for result in results)
+    moves = sum(result["moves"] for result in results)
+    latencies = sorted(
+        latency for result in results for latency in result["latencies"]
+    )
+    print(f"Games: {games} ({height}x{width}, {mines} mines, "
+          f"{processes} processes)")
+    print(f"Win rate: {wins / games:.2%}")
+    print(f"Moves/sec: {moves / elapsed:.0f}")
+    print(f"add_knowledge p50: {percentile(latencies, 50) * 1000:.3f} ms")
+    print(f"add_knowledge p99: {percentile(latencies, 99) * 1000:.3f} ms")
+
+
+def simulate(games, height, width, mines, processes=None, seed=0):
+    """
+    Play `games` games in a process pool and return their results.
+    Game `n` is played with its RNG seeded from `seed + n`, so results
+    don't depend on the number of processes.
+    """
+    tasks = [(seed + n, height, width, mines) for n in range(games)]
+    with multiprocessing.Pool(processes) as pool:
+        return pool.starmap(play, tasks, chunksize=max(1, games // 64))
+
+
+def play(seed, height, width, mines):
+    """
+    Play one game of Minesweeper with the AI, and return whether it
+    won, how many moves it made, and the time taken by each call
+    to `add_knowledge`.
+    """
+    random.seed(seed)
+    game = Minesweeper(height=height, width=width, mines=mines)
+    ai = MinesweeperAI(height=height, width=width, mines=mines)
+    latencies = []
+    won = False
+
+    while True:
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+            if move is None:
+                won = ai.mines == game.mines
+                break
+        if game.is_mine(move):
+            break
+
+        nearby = game.nearby_mines(move)
+        before = time.perf_counter()
+        ai.add_knowledge(move, nearby)
+        latencies.append(time.perf_counter() - before)
+
+        # Every safe cell has been revealed
+        if len(ai.moves_made) == height * width - mines:
+            won = True
+            break
+
+    return {
+        "won": won,
+        "moves": len(ai.moves_made),
+        "latencies": latencies
+    }
+
+
+def percentile(values, p):
+    """
+    Return the p-th percentile of a sorted list of values.
+    """
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 import csv
 import itertools
+import random
 import sys
 
+import numpy as np
+
 PROBS = {
 
     # Unconditional probabilities for having gene
@@ -36,53 +39,53 @@ PROBS = {
     "mutation": 0.01
 }
 
+# Possible numbers of copies of the gene
+GENES = (0, 1, 2)
 
-def main():
+# Probability of each number of genes in someone with no parents listed
+GENE_PRIOR = np.array([PROBS["gene"][genes] for genes in GENES])
 
-    # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
-    people = load_data(sys.argv[1])
+# Probability of a parent with each number of genes passing one on
+PASSING = np.array([PROBS["mutation"], 0.5, 1 - PROBS["mutation"]])
 
-    # Keep track of gene and trait probabilities for each person
-    probabilities = {
-        person: {
-            "gene": {
-                2: 0,
-                1: 0,
-                0: 0
-            },
-            "trait": {
-                True: 0,
-                False: 0
-            }
-        }
-        for person in people
-    }
+# Probability of a child's number of genes, indexed [mother, father, child]
+INHERITANCE = np.stack([
+    np.outer(1 - PASSING, 1 - PASSING),
+    np.outer(PASSING, 1 - PASSING) + np.outer(1 - PASSING, PASSING),
+    np.outer(PASSING, PASSING)
+], axis=-1)
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
+# Probability of trait given number of genes, indexed [genes, trait]
+EMISSION = np.array([
+    [PROBS["trait"][genes][False], PROBS["trait"][genes][True]]
+    for genes in GENES
+])
 
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
+# Largest standard error, and potential scale reduction factor (R-hat),
+# of sampled probabilities before sampling stops
+STANDARD_ERROR = 0.005
+RHAT = 1.01
 
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
 
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+def main():
 
-    # Ensure probabilities sum to 1
-    normalize(probabilities)
+    # Check for proper usage
+    methods = {
+        "exact": einsum_elimination,
+        "weighting": likelihood_weighting,
+        "gibbs": gibbs_sampling
+    }
+    method = sys.argv[2] if len(sys.argv) == 3 else "exact"
+    if len(sys.argv) not in [2, 3] or method not in methods:
+        sys.exit("Usage: python heredity.py data.csv [exact|weighting|gibbs]")
+    people = load_data(sys.argv[1])
+    method = methods[method]
+
+    # Compute gene and trait probabilities for each person
+    if method is einsum_elimination:
+        probabilities, diagnostics = method(people), None
+    else:
+        probabilities, diagnostics = method(people)
 
     # Print results
     for person in people:
@@ -92,6 +95,12 @@ def main():
             for value in probabilities[person][field]:
                 p = probabilities[person][field][value]
                 print(f"    {value}: {p:.4f}")
+    if diagnostics is not None:
+        print("Diagnostics:")
+        for field, value in diagnostics.items():
+            if isinstance(value, float):
+                value = f"{value:.4g}"
+            print(f"  {field}: {value}")
 
 
 def load_data(filename):
@@ -139,83 +148,23 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone in set `have_trait` has the trait, and
         * everyone not in set` have_trait` does not have the trait.
     """
-    zero_gene = []
-    dont_have_trait = []
-
-    for person in people:
-        if person not in one_gene and person not in two_genes:
-            zero_gene.append(person)
-        if person not in have_trait:
-            dont_have_trait.append(person)
-
-    total_prob = 1
-    for person in people:
-        if people[person]["mother"] is None and people[person]["father"] is None:
-            total_prob *= getTraitProbabilityForNonChild(people,
-                                                         person, one_gene, two_genes, have_trait, zero_gene)
-        else:
-            total_prob *= getTraitProbabilityForChild(people,
-                                                      person, one_gene, two_genes, have_trait, zero_gene)
-
-    return total_prob
-
-
-def getTraitProbabilityForNonChild(people, person, one_gene, two_genes, have_trait, zero_gene):
-    prob_gene = 1
-    num_genes = 0
-    if person in zero_gene:
-        prob_gene = PROBS["gene"][0]
-        num_genes = 0
-    if person in one_gene:
-        prob_gene = PROBS["gene"][1]
-        num_genes = 1
-    if person in two_genes:
-        prob_gene = PROBS["gene"][2]
-        num_genes = 2
-
-    prob_trait = 1
-    if person in have_trait:
-        prob_trait = PROBS["trait"][num_genes][True]
-    else:
-        prob_trait = PROBS["trait"][num_genes][False]
-
-    return prob_gene * prob_trait
-
-
-def getTraitProbabilityForChild(people, person, one_gene, two_genes, have_trait, zero_gene):
-    mother = people[person]["mother"]
-    father = people[person]["father"]
-
-    prob_gene = 1
-    if mother in zero_gene:
-        mother_inherited_gene = PROBS["mutation"]
-    elif mother in one_gene:
-        mother_inherited_gene = 0.5
-    else:
-        mother_inherited_gene = 1 - PROBS["mutation"]
-
-    if father in zero_gene:
-        father_inherited_gene = PROBS["mutation"]
-    elif father in one_gene:
-        father_inherited_gene = 0.5
-    else:
-        father_inherited_gene = 1 - PROBS["mutation"]
-
-    if person in zero_gene:
-        num_genes = 0
-        prob_gene = (1 - mother_inherited_gene) * (1 - father_inherited_gene)
-    if person in one_gene:
-        num_genes = 1
-        prob_gene = mother_inherited_gene * \
-            (1 - father_inherited_gene) + father_inherited_gene * (1 - mother_inherited_gene)
-    if person in two_genes:
-        num_genes = 2
-        prob_gene = mother_inherited_gene * father_inherited_gene
-
-    want_trait = person in have_trait
-    prob_trait = PROBS["trait"][num_genes][want_trait]
+    pedigree = compile_pedigree(people)
+    genes = [
+        2 if person in two_genes else 1 if person in one_gene else 0
+        for person in pedigree.names
+    ]
 
-    return prob_gene * prob_trait
+    # Multiply table entries as Python floats, which beats NumPy's
+    # per-call overhead for a single assignment
+    prior, inheritance, emission = pedigree.tables
+    p = 1
+    for founder in pedigree.founder_list:
+        p *= prior[genes[founder]]
+    for mother, father, child in pedigree.families:
+        p *= inheritance[genes[mother]][genes[father]][genes[child]]
+    for person, name in enumerate(pedigree.names):
+        p *= emission[genes[person]][name in have_trait]
+    return p
 
 
 def update(probabilities, one_gene, two_genes, have_trait, p):
@@ -263,5 +212,541 @@ def normalize(probabilities):
         probabilities[person]["trait"][last_trait] += round(1 - total_trait_probability, 5)
 
 
+# Most recently compiled family, and its Pedigree
+compiled = (None, None)
+
+
+def compile_pedigree(people):
+    """
+    Return the Pedigree for `people`, reusing the last one compiled
+    if the people, their parents and their traits are unchanged.
+    """
+    global compiled
+    family = tuple(
+        (name, person["mother"], person["father"], person["trait"])
+        for name, person in people.items()
+    )
+    if compiled[0] != family:
+        compiled = (family, Pedigree(people))
+    return compiled[1]
+
+
+class Pedigree():
+    """
+    Pedigree compiled into arrays of integer indices into its people,
+    for looking up probability tables for everyone at once.
+    """
+
+    def __init__(self, people):
+        self.names = list(people)
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+        # People with no parents listed, and everyone else with parents
+        self.founders = np.array([
+            self.index[name] for name in self.names
+            if people[name]["mother"] is None
+        ], dtype=np.intp)
+        self.children = np.array([
+            self.index[name] for name in self.names
+            if people[name]["mother"] is not None
+        ], dtype=np.intp)
+        self.mothers = np.array([
+            self.index[people[self.names[child]]["mother"]]
+            for child in self.children
+        ], dtype=np.intp)
+        self.fathers = np.array([
+            self.index[people[self.names[child]]["father"]]
+            for child in self.children
+        ], dtype=np.intp)
+
+        # The same as Python lists, for scoring one assignment at a time
+        self.founder_list = self.founders.tolist()
+        self.families = list(zip(
+            self.mothers.tolist(), self.fathers.tolist(),
+            self.children.tolist()
+        ))
+        self.tables = (
+            GENE_PRIOR.tolist(), INHERITANCE.tolist(), EMISSION.tolist()
+        )
+
+        # Children grouped by generation, each after both their parents
+        depth = dict()
+        for name in self.names:
+            stack = [name]
+            while stack:
+                person = stack[-1]
+                parents = [
+                    parent for parent in
+                    (people[person]["mother"], people[person]["father"])
+                    if parent is not None
+                ]
+                waiting = [parent for parent in parents if parent not in depth]
+                if waiting:
+                    stack.extend(waiting)
+                    continue
+                stack.pop()
+                depth[person] = 1 + max(
+                    (depth[parent] for parent in parents), default=-1
+                )
+        depths = np.array([
+            depth[self.names[child]] for child in self.children
+        ], dtype=np.intp)
+        self.generations = [
+            np.flatnonzero(depths == generation)
+            for generation in range(1, depths.max(initial=0) + 1)
+        ]
+
+        # Known traits as 0 or 1, and -1 where unknown
+        self.traits = np.array([
+            -1 if people[name]["trait"] is None else int(people[name]["trait"])
+            for name in self.names
+        ], dtype=np.intp)
+
+    def sample(self, size, rng):
+        """
+        Return `size` independent draws of everyone's number of genes,
+        each a row of an array, sampling founders from GENE_PRIOR and
+        then each generation of children given their parents.
+        """
+        genes = np.zeros((size, len(self.names)), dtype=np.intp)
+        genes[:, self.founders] = sample_categorical(
+            np.broadcast_to(GENE_PRIOR, (size, len(self.founders), 3)), rng
+        )
+        for generation in self.generations:
+            genes[:, self.children[generation]] = sample_categorical(
+                INHERITANCE[
+                    genes[:, self.mothers[generation]],
+                    genes[:, self.fathers[generation]]
+                ], rng
+            )
+        return genes
+
+    def blocks(self):
+        """
+        Return groups of people, as arrays of indices, such that no two
+        people in a group share a factor of the joint distribution.
+        People in a group are independent given everyone else, so can be
+        resampled together.
+        """
+        neighbors = [set() for _ in self.names]
+        for family in zip(self.mothers.tolist(), self.fathers.tolist(),
+                          self.children.tolist()):
+            for person in family:
+                neighbors[person].update(family)
+                neighbors[person].discard(person)
+
+        # Greedily colour people in order, so neighbours differ in colour
+        colours = []
+        for person in range(len(self.names)):
+            taken = {colours[other] for other in neighbors[person]
+                     if other < person}
+            colours.append(min(set(range(len(taken) + 1)) - taken))
+        colours = np.array(colours)
+        return [
+            np.flatnonzero(colours == colour)
+            for colour in range(colours.max(initial=-1) + 1)
+        ]
+
+    def factors(self):
+        """
+        Return the factors of the joint distribution over everyone's number
+        of genes, given the known traits, as pairs of a tuple of person
+        indices and a NumPy table with one axis per person.
+        """
+        factors = [
+            ((founder,), GENE_PRIOR) for founder in self.founders.tolist()
+        ]
+        factors.extend(
+            ((mother, father, child), INHERITANCE)
+            for mother, father, child in self.families
+        )
+        factors.extend(
+            ((person,), EMISSION[:, trait])
+            for person, trait in enumerate(self.traits.tolist()) if trait >= 0
+        )
+        return factors
+
+
+def min_fill_order(factors):
+    """
+    Return an elimination order for all variables, each time choosing the
+    variable whose elimination adds the fewest new edges between its
+    neighbours in the graph linking variables that share a factor.
+    """
+    neighbors = dict()
+    for variables, _ in factors:
+        for variable in variables:
+            neighbors.setdefault(variable, set()).update(variables)
+            neighbors[variable].discard(variable)
+
+    def fill(variable):
+        adjacent = list(neighbors[variable])
+        return sum(
+            1 for i, a in enumerate(adjacent) for b in adjacent[i + 1:]
+            if b not in neighbors[a]
+        )
+
+    order = []
+    while neighbors:
+        variable = min(
+            neighbors, key=lambda v: (fill(v), len(neighbors[v]))
+        )
+        adjacent = neighbors.pop(variable)
+        for a in adjacent:
+            neighbors[a].discard(variable)
+            neighbors[a].update(adjacent - {a})
+        order.append(variable)
+    return order
+
+
+def contract(factors, keep):
+    """
+    Return the product of several NumPy factors, with every variable
+    not in `keep` summed out, contracted in one call to `numpy.einsum`
+    along an optimized path.
+    """
+    labels = dict()
+    operands = []
+    for variables, table in factors:
+        operands.append(table)
+        operands.append([labels.setdefault(v, len(labels)) for v in variables])
+    keep = tuple(variable for variable in labels if variable in keep)
+    if not operands:
+        return keep, np.ones(())
+    return keep, np.einsum(
+        *operands, [labels[variable] for variable in keep],
+        optimize=len(factors) > 2
+    )
+
+
+def propagate(factors):
+    """
+    Return each variable's unnormalized marginal, as a factor over just
+    that variable, using `contract` to multiply factors and sum out
+    variables.
+
+    Variables are eliminated once in min-fill order. Each elimination
+    multiplies the factors mentioning the variable into a bucket and
+    passes the summed-out product on to the bucket of the next variable
+    it mentions. A second pass back down the buckets then gives every
+    bucket the rest of the evidence, so all marginals come from one
+    elimination, in time exponential only in the treewidth.
+    """
+    order = min_fill_order(factors)
+    position = {variable: i for i, variable in enumerate(order)}
+
+    # Upward pass: place each factor in the bucket of its first variable
+    buckets = {variable: [] for variable in order}
+    for factor in factors:
+        buckets[min(factor[0], key=position.get)].append(factor)
+    parent = dict()
+    upward = dict()
+    for variable in order:
+        bucket = buckets[variable]
+        keep = {v for variables, _ in bucket for v in variables} - {variable}
+        message = contract(bucket, keep)
+        upward[variable] = message
+        if message[0]:
+            parent[variable] = min(message[0], key=position.get)
+            buckets[parent[variable]].append(message)
+    children = {variable: [] for variable in order}
+    for child in order:
+        if child in parent:
+            children[parent[child]].append(child)
+
+    # Downward pass: send each bucket the evidence from outside it
+    downward = dict()
+    marginals = dict()
+    for variable in reversed(order):
+        incoming = [downward[variable]] if variable in downward else []
+        for child in children[variable]:
+            others = [f for f in buckets[variable] if f is not upward[child]]
+            downward[child] = contract(others + incoming, upward[child][0])
+        marginals[variable] = contract(
+            buckets[variable] + incoming, (variable,)
+        )
+    return marginals
+
+
+def distributions(people, genes):
+    """
+    Return each person's gene and trait probability distributions,
+    given the unnormalized probabilities of 0, 1 and 2 genes for each.
+    """
+    probabilities = dict()
+    for person in people:
+        gene = np.asarray(genes[person], dtype=float)
+        gene = gene / gene.sum()
+
+        # Traits depend only on the person's own genes
+        trait = people[person]["trait"]
+        if trait is not None:
+            has_trait = 1 if trait else 0
+        else:
+            has_trait = float(gene @ EMISSION[:, 1])
+        probabilities[person] = {
+            "gene": {genes: float(gene[genes]) for genes in (2, 1, 0)},
+            "trait": {True: has_trait, False: 1 - has_trait}
+        }
+    return probabilities
+
+
+def einsum_elimination(people):
+    """
+    Return each person's gene and trait probability distributions,
+    computed exactly by variable elimination over the pedigree's
+    NumPy probability tables.
+    """
+    pedigree = Pedigree(people)
+    marginals = propagate(pedigree.factors())
+    return distributions(people, {
+        person: marginals[pedigree.index[person]][1] for person in people
+    })
+
+
+class GibbsBlock():
+    """
+    Group of people in a pedigree that share no factor, with the
+    factors mentioning them, for resampling their genes together.
+    """
+
+    def __init__(self, pedigree, people):
+        self.people = people
+        row = np.full(len(pedigree.names), -1)
+        row[people] = np.arange(len(people))
+
+        # Founders' priors, and children's inheritance from their parents
+        founders = row[pedigree.founders]
+        self.founders = founders[founders >= 0]
+        own = row[pedigree.children] >= 0
+        self.children = row[pedigree.children[own]]
+        self.child_mothers = pedigree.mothers[own]
+        self.child_fathers = pedigree.fathers[own]
+
+        # Inheritance of children from parents in the group, sorted by
+        # parent so each parent's children are summed as one run
+        mothers = np.flatnonzero(row[pedigree.mothers] >= 0)
+        mothers = mothers[np.argsort(row[pedigree.mothers[mothers]])]
+        self.mothers, self.mother_runs = np.unique(
+            row[pedigree.mothers[mothers]], return_index=True
+        )
+        self.fathers_of_children = pedigree.fathers[mothers]
+        self.children_of_mothers = pedigree.children[mothers]
+        fathers = np.flatnonzero(row[pedigree.fathers] >= 0)
+        fathers = fathers[np.argsort(row[pedigree.fathers[fathers]])]
+        self.fathers, self.father_runs = np.unique(
+            row[pedigree.fathers[fathers]], return_index=True
+        )
+        self.mothers_of_children = pedigree.mothers[fathers]
+        self.children_of_fathers = pedigree.children[fathers]
+
+        # Known traits
+        known = people[pedigree.traits[people] >= 0]
+        self.known = row[known]
+        self.emission = np.log(EMISSION[:, pedigree.traits[known]].T)
+
+        # Log tables, with inheritance also indexed by a parent's genes
+        # last, flattened so a pair of other genes takes one lookup
+        inheritance = np.log(INHERITANCE)
+        self.prior = np.log(GENE_PRIOR)
+        self.inheritance = inheritance.reshape(9, 3)
+        self.by_mother = inheritance.transpose(1, 2, 0).reshape(9, 3)
+        self.by_father = inheritance.transpose(0, 2, 1).reshape(9, 3)
+
+    def conditional(self, genes):
+        """
+        Return the unnormalized log probability of each number of genes
+        for each person in the group, given everyone else's genes, for
+        each column of `genes`, which has a row for each person.
+        """
+        logits = np.zeros((len(self.people), genes.shape[1], 3))
+        logits[self.founders] += self.prior
+        logits[self.children] += np.take(self.inheritance, (
+            3 * genes[self.child_mothers] + genes[self.child_fathers]
+        ), axis=0)
+        as_mother = np.take(self.by_mother, (
+            3 * genes[self.fathers_of_children]
+            + genes[self.children_of_mothers]
+        ), axis=0)
+        as_father = np.take(self.by_father, (
+            3 * genes[self.mothers_of_children]
+            + genes[self.children_of_fathers]
+        ), axis=0)
+        logits[self.mothers] += np.add.reduceat(
+            as_mother, self.mother_runs, axis=0
+        )
+        logits[self.fathers] += np.add.reduceat(
+            as_father, self.father_runs, axis=0
+        )
+        logits[self.known] += self.emission[:, None]
+        return logits
+
+
+def sample_categorical(weights, rng):
+    """
+    Return one draw from each categorical distribution along the last
+    axis of `weights`, which need not sum to 1.
+    """
+    cumulative = weights.cumsum(axis=-1)
+    draws = rng.random(cumulative.shape[:-1] + (1,)) * cumulative[..., -1:]
+    draws = (cumulative <= draws).sum(axis=-1)
+    return np.minimum(draws, weights.shape[-1] - 1)
+
+
+def likelihood_weighting(people, target=STANDARD_ERROR, batch=10000,
+                         min_effective=500, max_samples=10 ** 6, seed=None):
+    """
+    Return each person's approximate gene and trait probability
+    distributions, and sampling diagnostics, by likelihood weighting.
+
+    Batches of `batch` pedigrees are sampled forward from the genes
+    prior, and each is weighted by the likelihood of the known traits.
+    Sampling stops once every gene probability has a standard error of
+    at most `target` and the effective sample size is at least
+    `min_effective`, or after `max_samples` samples. The effective
+    sample size guards against stopping when a few samples dominate the
+    weights, where the estimates collapse towards 0 or 1 and their
+    standard errors look tiny.
+
+    Diagnostics are the number of samples, the effective sample size,
+    the largest standard error, and whether sampling converged.
+    """
+    pedigree = Pedigree(people)
+    if seed is None:
+        seed = random.getrandbits(64)
+    rng = np.random.default_rng(seed)
+    known = np.flatnonzero(pedigree.traits >= 0)
+    log_emission = np.log(EMISSION)
+
+    # Weighted counts, kept relative to the largest log weight seen
+    counts = np.zeros((len(pedigree.names), 3))
+    total = 0
+    squares = 0
+    scale = -np.inf
+    samples = 0
+    while samples < max_samples:
+        genes = pedigree.sample(batch, rng)
+        log_weights = log_emission[
+            genes[:, known], pedigree.traits[known]
+        ].sum(axis=1)
+        if log_weights.max() > scale:
+            shift = np.exp(scale - log_weights.max())
+            counts *= shift
+            total *= shift
+            squares *= shift ** 2
+            scale = log_weights.max()
+        weights = np.exp(log_weights - scale)
+        for genes_count in GENES:
+            counts[:, genes_count] += weights @ (genes == genes_count)
+        total += weights.sum()
+        squares += weights @ weights
+        samples += batch
+
+        # Standard error from the effective number of samples
+        probabilities = counts / total
+        ess = total ** 2 / squares
+        error = np.sqrt(probabilities * (1 - probabilities) / ess).max()
+        converged = bool(error <= target and ess >= min_effective)
+        if converged:
+            break
+
+    return distributions(people, {
+        person: counts[pedigree.index[person]] for person in people
+    }), {
+        "samples": samples,
+        "effective samples": float(ess),
+        "standard error": float(error),
+        "converged": converged
+    }
+
+
+def gibbs_sampling(people, target=STANDARD_ERROR, chains=32, batch=100,
+                   burn_in=100, min_batches=10, max_sweeps=10 ** 5,
+                   seed=None):
+    """
+    Return each person's approximate gene and trait probability
+    distributions, and sampling diagnostics, by blocked Gibbs sampling.
+
+    `chains` independent chains start from forward samples of the
+    pedigree. Each sweep resamples every block of people from `blocks`
+    at once, each person given their parents, children, children's
+    other parents and trait. After `burn_in` sweeps, sweeps are averaged
+    in batches of `batch`. After at least `min_batches` batches,
+    sampling stops once every gene probability has a standard error of
+    at most `target` and an R-hat of at most RHAT, or after
+    `max_sweeps` sweeps.
+
+    Diagnostics are the number of samples, the smallest effective
+    sample size and largest standard error (from the variance of batch
+    means), the largest R-hat across chains, and whether sampling
+    converged.
+    """
+    if max_sweeps < burn_in + max(min_batches, 2) * batch:
+        raise ValueError("max_sweeps must allow min_batches after burn_in")
+    pedigree = Pedigree(people)
+    if seed is None:
+        seed = random.getrandbits(64)
+    rng = np.random.default_rng(seed)
+
+    # Chains' genes with a row per person, and sums, and sums of squares,
+    # of each chain's batch means
+    blocks = [GibbsBlock(pedigree, block) for block in pedigree.blocks()]
+    genes = np.ascontiguousarray(pedigree.sample(chains, rng).T)
+    counts = np.zeros((len(pedigree.names), chains, 3))
+    sums = np.zeros_like(counts)
+    squares = np.zeros_like(counts)
+    batches = 0
+    for sweep in range(max_sweeps):
+        for block in blocks:
+            logits = block.conditional(genes)
+            genes[block.people] = sample_categorical(
+                np.exp(logits - logits.max(axis=-1, keepdims=True)), rng
+            )
+        if sweep < burn_in:
+            continue
+        counts += genes[..., None] == np.arange(3)
+        if (sweep + 1 - burn_in) % batch:
+            continue
+        sums += counts / batch
+        squares += (counts / batch) ** 2
+        counts[:] = 0
+        batches += 1
+        if batches < max(min_batches, 2):
+            continue
+
+        # Standard error and effective samples from the batch means
+        means = batches * chains
+        probabilities = sums.sum(axis=1) / means
+        spread = ((squares.sum(axis=1) - means * probabilities ** 2)
+                  / (means - 1)).clip(min=0)
+        error = np.sqrt(spread / means).max()
+        varying = spread > 0
+        ess = (probabilities * (1 - probabilities) * means)[varying]
+        ess = (ess / spread[varying]).min(initial=batches * batch * chains)
+
+        # R-hat compares the variance within and between chains
+        chain_means = sums / batches
+        draws = batches * batch
+        within = (chain_means * (1 - chain_means)).mean(axis=1)
+        between = draws * chain_means.var(axis=1, ddof=1)
+        pooled = (draws - 1) / draws * within + between / draws
+        rhat = np.sqrt(np.divide(
+            pooled, within, out=np.ones_like(pooled), where=within > 0
+        )).max()
+        converged = bool(error <= target and rhat <= RHAT)
+        if converged:
+            break
+
+    return distributions(people, {
+        person: probabilities[pedigree.index[person]] for person in people
+    }), {
+        "samples": batches * batch * chains,
+        "effective samples": float(ess),
+        "standard error": float(error),
+        "r-hat": float(rhat),
+        "converged": converged
+    }
+
+
 if __name__ == "__main__":
     main()
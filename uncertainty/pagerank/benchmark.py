@@ -0,0 +1,160 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from pagerank import (DAMPING, LinkGraph, crawl, crawl_to_disk,
+                      out_of_core_pagerank, power_iterate, sample_walkers)
+
+# Links added by each new page
+LINKS_PER_PAGE = 5
+
+# Largest corpus written out as HTML files for crawling
+MAX_HTML_PAGES = 10 ** 5
+
+# Samples taken per page, and steps taken by each random surfer
+SAMPLES_PER_PAGE = 100
+STEPS_PER_WALKER = 100
+
+
+def main():
+
+    # Check command-line arguments
+    if len(sys.argv) not in [1, 2, 3]:
+        sys.exit("Usage: python benchmark.py [max_pages] [dangling_fraction]")
+    max_pages = int(float(sys.argv[1])) if len(sys.argv) >= 2 else 10 ** 5
+    dangling = float(sys.argv[2]) if len(sys.argv) == 3 else 0.1
+
+    print(f"{'pages':>10} {'phase':<14} {'time (s)':>10} "
+          f"{'peak (MiB)':>11} {'L1 error':>10}")
+    n = 10 ** 3
+    while n <= max_pages:
+        rng = np.random.default_rng(n)
+        sources, targets = generate_graph(n, dangling, rng)
+        with tempfile.TemporaryDirectory() as directory:
+            edges_path = os.path.join(directory, "edges.bin")
+            np.stack((sources, targets), axis=1).tofile(edges_path)
+
+            # Crawl an HTML corpus, if it is small enough to write out
+            if n <= MAX_HTML_PAGES:
+                corpus = os.path.join(directory, "corpus")
+                write_corpus(corpus, n, sources, targets)
+                report(n, "crawl", measure(crawl, corpus))
+                report(n, "crawl_to_disk", measure(
+                    crawl_to_disk, corpus,
+                    os.path.join(directory, "crawled.bin"),
+                    os.path.join(directory, "crawled.txt")
+                ))
+
+            graph = LinkGraph(range(n), sources, targets)
+            del sources, targets
+
+            # Iterate in memory, and out of core from the edge list
+            (iterated, _), elapsed, peak = measure(
+                power_iterate, graph, DAMPING
+            )
+            report(n, "iterate", (None, elapsed, peak))
+            report(n, "out of core", measure(
+                out_of_core_pagerank, edges_path, n, DAMPING
+            ))
+
+            # Sample, and compare against the iterated ranks
+            samples = SAMPLES_PER_PAGE * n
+            walkers = samples // STEPS_PER_WALKER
+            counts, elapsed, peak = measure(
+                sample_walkers, graph, DAMPING, samples, walkers, rng
+            )
+            error = np.abs(counts / samples - iterated).sum()
+            report(n, "sample", (None, elapsed, peak), error)
+        n *= 10
+
+
+def generate_graph(n, dangling, rng):
+    """
+    Return the sources and destinations of the links of a random
+    preferential-attachment web graph with `n` pages, where about a
+    `dangling` fraction of pages have no links.
+
+    Each page links to LINKS_PER_PAGE earlier pages, half chosen
+    uniformly and half by copying the destination of an earlier link,
+    which favours pages that already have many inbound links. Pages are
+    added in batches that only copy from links made by earlier batches,
+    so each batch is one vectorized draw.
+    """
+    sources = [np.zeros(0, dtype=np.int32)]
+    targets = [np.zeros(0, dtype=np.int32)]
+    made = 0
+    start = 1
+    while start < n:
+        end = min(n, 2 * start)
+        source = np.repeat(np.arange(start, end), LINKS_PER_PAGE)
+        target = (rng.random(len(source)) * source).astype(np.int64)
+        if made:
+            earlier = np.concatenate(targets)
+            copy = rng.random(len(source)) < 0.5
+            target[copy] = earlier[rng.integers(made, size=copy.sum())]
+        sources.append(source.astype(np.int32))
+        targets.append(target.astype(np.int32))
+        made += len(source)
+        start = end
+    sources = np.concatenate(sources)
+    targets = np.concatenate(targets)
+
+    # Remove duplicate links and the links of dangling pages
+    links = np.unique(sources.astype(np.int64) * n + targets)
+    sources, targets = np.divmod(links, n)
+    keep = ~(rng.random(n) < dangling)[sources]
+    return sources[keep].astype(np.int32), targets[keep].astype(np.int32)
+
+
+def write_corpus(directory, n, sources, targets):
+    """
+    Write a graph out as a directory of HTML pages.
+    """
+    os.mkdir(directory)
+    start = np.searchsorted(sources, np.arange(n + 1))
+    for page in range(n):
+        links = "".join(
+            f'<a href="{target}.html">{target}</a>\n'
+            for target in targets[start[page]:start[page + 1]].tolist()
+        )
+        with open(os.path.join(directory, f"{page}.html"), "w") as f:
+            f.write(f"<html><body>\n{links}</body></html>\n")
+
+
+def measure(function, *args):
+    """
+    Call a function, and return its result, the elapsed time in
+    seconds, and the peak memory it allocated in bytes.
+
+    Memory is traced in a second call, since tracing slows down
+    allocation-heavy phases such as crawling. Only this process is
+    traced, so the peak for a phase that uses worker processes leaves
+    out their memory.
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def report(n, phase, measurement, error=None):
+    """
+    Print one row of benchmark results.
+    """
+    _, elapsed, peak = measurement
+    error = "-" if error is None else f"{error:.4f}"
+    print(f"{n:>10} {phase:<14} {elapsed:>10.4f} "
+          f"{peak / 2 ** 20:>11.1f} {error:>10}")
+
+
+if __name__ == "__main__":
+    main()